@@ -5,7 +5,8 @@ This server provides a minimal backend for storing and retrieving
 tree labels using a CSV file. It serves static files from the
 `static` directory and exposes a small JSON API under `/api/trees`.
 No external dependencies (such as Flask) are required, making
-deployment extremely lightweight.
+deployment extremely lightweight; if `orjson` happens to be installed
+it is used for faster JSON encoding and decoding.
 
 Endpoints:
   GET /                - Serve the main application (index.html)
@@ -17,40 +18,479 @@ The CSV file is stored in `data/trees.csv`. If it does not exist,
 it will be created automatically with an appropriate header.
 
 Run this script directly to start the server on port 8000 (or
-another port specified via the PORT environment variable).
+another port specified via the PORT environment variable). Other
+environment variables:
+
+  TREEWALK_KEEPALIVE     - Seconds an idle keep-alive connection is kept
+                           open (default 2; 0 disables keep-alive)
+  TREEWALK_WORKERS       - Number of worker processes sharing the port
+                           (default 1)
+  TREEWALK_HTTP_THREADS  - Request-handling threads per worker
+                           (default 4 per CPU, at most 32)
 """
 
+import collections
 import csv
+import datetime
+import email.utils
+import gzip
+import hashlib
+import io
 import json
+import mimetypes
+import mmap
 import os
+import re
+import shutil
+import signal
+import socket
+import sys
 import threading
-from datetime import datetime
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from http.server import HTTPServer, SimpleHTTPRequestHandler
+from json.encoder import encode_basestring_ascii
 from urllib.parse import urlparse
-import socketserver
 
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    _loads = json.loads
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
 STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
 CSV_PATH = os.path.join(DATA_DIR, "trees.csv")
+FIELDNAMES = ["id", "lat", "lon", "species", "notes", "timestamp"]
+MAX_BODY_BYTES = 64 * 1024
+# Upper bound on rows the writer thread coalesces into one write + fdatasync.
+BATCH_MAX_ROWS = 256
+APPEND_FLAGS = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+# Seconds a keep-alive connection may sit idle between requests (0 turns
+# keep-alive off): with a bounded pool every idle connection pins a thread,
+# so keep it short.
+KEEPALIVE_TIMEOUT = float(os.environ.get("TREEWALK_KEEPALIVE", 2))
+# Longest a new connection may stay silent before its first request; kept
+# short because every open connection pins a pool thread.
+CONNECT_TIMEOUT = 2
+# Longest a client may take to send a request's headers or body.
+REQUEST_TIMEOUT = 30
+WORKERS = int(os.environ.get("TREEWALK_WORKERS", 1))
+HTTP_THREADS = int(
+    os.environ.get("TREEWALK_HTTP_THREADS", min(32, (os.cpu_count() or 1) * 4))
+)
 
 
 def ensure_csv() -> None:
-    """Ensure the CSV file exists and has the correct header."""
+    """Ensure the CSV file exists with its header and is open for appends.
+
+    If the file was deleted or replaced (an editor's rename-on-save,
+    ``sed -i``, another worker recreating it) the append descriptor is
+    repointed at the file now at CSV_PATH, so rows never go to an orphaned
+    inode. Each process must call this itself; it only fixes its own
+    descriptor.
+    """
+    global _append_fd
+    with csv_lock:
+        try:
+            st = os.stat(CSV_PATH)
+        except FileNotFoundError:
+            _create_csv()
+            st = os.stat(CSV_PATH)
+        if _append_fd is None:
+            _append_fd = os.open(CSV_PATH, APPEND_FLAGS, 0o644)
+            return
+        current = os.fstat(_append_fd)
+        if (current.st_dev, current.st_ino) != (st.st_dev, st.st_ino):
+            # Repoint the existing descriptor atomically so concurrent
+            # appenders never see it closed.
+            fd = os.open(CSV_PATH, APPEND_FLAGS, 0o644)
+            os.dup2(fd, _append_fd, inheritable=False)
+            os.close(fd)
+
+
+def _create_csv() -> None:
+    """Create CSV_PATH containing only the header, unless it already exists.
+
+    The header is written to a temporary file that is then hard-linked into
+    place, so other processes never see (or append to) a headerless file.
+    """
     os.makedirs(DATA_DIR, exist_ok=True)
-    if not os.path.exists(CSV_PATH):
-        with open(CSV_PATH, "w", newline="", encoding="utf-8") as file:
-            writer = csv.writer(file)
-            writer.writerow(["id", "lat", "lon", "species", "notes", "timestamp"])
+    tmp_path = "%s.%d.tmp" % (CSV_PATH, os.getpid())
+    with open(tmp_path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file, lineterminator="\n")
+        writer.writerow(FIELDNAMES)
+    try:
+        os.link(tmp_path, CSV_PATH)
+    except FileExistsError:
+        pass
+    finally:
+        os.unlink(tmp_path)
+
+
+def close_csv() -> None:
+    """Close the long-lived append descriptor opened by ensure_csv."""
+    global _append_fd
+    with csv_lock:
+        if _append_fd is not None:
+            os.close(_append_fd)
+            _append_fd = None
+
+
+_NEEDS_QUOTE = re.compile(r'[,"\r\n]').search
+
+
+def _csv_field(value) -> str:
+    """Render a free-text value as a CSV field, quoting it only if needed."""
+    if value is None:
+        return ""
+    value = str(value)
+    if _NEEDS_QUOTE(value):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _format_row(tree_id, lat, lon, species, notes, ts) -> bytes:
+    """Format one CSV line for the fixed tree schema."""
+    return (
+        f"{tree_id},{lat!r},{lon!r},{_csv_field(species)},{_csv_field(notes)},{ts}\n"
+    ).encode("utf-8")
+
+
+def _new_columns() -> tuple:
+    """Return empty parallel lists, one per CSV column, in FIELDNAMES order."""
+    return tuple([] for _ in FIELDNAMES)
+
+
+def _parse_csv(mm) -> tuple:
+    """Parse the CSV body (after the header) from a buffer into columns.
+
+    Lines are sliced straight out of the mapping and split on commas. Only
+    lines containing a quote, which may hold escaped commas or span several
+    lines, go through csv.reader. A stray quote inside an unquoted field (a
+    hand edit such as ``a"b``) throws the quote counting off; the whole
+    buffer is then re-parsed with csv.reader, as csv.DictReader would.
+    """
+    try:
+        return _split_csv(mm)
+    except csv.Error:
+        return _read_csv(mm)
+
+
+def _add_row(columns: tuple, row: list) -> None:
+    """Append `row` to `columns`, padding a short row with None.
+
+    Fields past the last column are dropped rather than kept under a None
+    key as csv.DictReader does.
+    """
+    if len(row) < len(columns):
+        row += [None] * (len(columns) - len(row))
+    for column, value in zip(columns, row):
+        column.append(value)
+
+
+def _split_csv(mm) -> tuple:
+    """Parse with the line-splitting fast path; raises csv.Error on stray quotes."""
+    columns = _new_columns()
+    end = len(mm)
+    pos = mm.find(b"\n") + 1 or end
+    while pos < end:
+        nl = mm.find(b"\n", pos)
+        if nl < 0:
+            nl = end
+        line = mm[pos:nl]
+        if b'"' in line:
+            # An odd number of quotes means a quoted field continues past
+            # this newline; extend to the end of the record.
+            while line.count(b'"') % 2 and nl < end:
+                nl = mm.find(b"\n", nl + 1)
+                if nl < 0:
+                    nl = end
+                line = mm[pos:nl]
+            row = next(csv.reader([line.decode("utf-8")]), None)
+        else:
+            line = line.rstrip(b"\r")
+            row = line.decode("utf-8").split(",") if line else None
+        pos = nl + 1
+        if row:
+            _add_row(columns, row)
+    return columns
+
+
+def _read_csv(mm) -> tuple:
+    """Parse the whole buffer with csv.reader."""
+    columns = _new_columns()
+    reader = csv.reader(io.StringIO(mm[:].decode("utf-8"), newline=""))
+    next(reader, None)
+    for row in reader:
+        if row:
+            _add_row(columns, row)
+    return columns
+
+
+def load_trees() -> tuple:
+    """Return the stored trees, re-parsing the CSV only when it has changed.
+
+    Trees are kept column-wise: a tuple of parallel lists (ids, lats, lons,
+    species, notes, timestamps) holding the raw CSV strings. The columns are
+    cached together with the file's mtime and size, so repeated reads of an
+    unchanged file skip both the file IO and the CSV parsing.
+    """
+    st = os.stat(CSV_PATH)
+    with cache_lock:
+        if st.st_mtime_ns == _cache["mtime_ns"] and st.st_size == _cache["size"]:
+            return _cache["columns"]
+        with open(CSV_PATH, "rb") as file:
+            st = os.fstat(file.fileno())
+            if st.st_size:
+                # Map exactly the bytes the cached size describes; rows
+                # appended after the fstat are picked up by the next stat.
+                with mmap.mmap(
+                    file.fileno(), st.st_size, access=mmap.ACCESS_READ
+                ) as mm:
+                    if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
+                    columns = _parse_csv(mm)
+            else:
+                columns = _new_columns()
+        _cache["mtime_ns"] = st.st_mtime_ns
+        _cache["size"] = st.st_size
+        _cache["columns"] = columns
+        _cache["records"] = []
+        _cache["payload"] = b""
+        _cache["etag"] = ""
+        return columns
+
+
+def _json_str(value) -> str:
+    return "null" if value is None else encode_basestring_ascii(value)
+
+
+_RECORD_TEMPLATE = (
+    '{"id": %s, "lat": %s, "lon": %s, "species": %s, "notes": %s, "timestamp": %s}'
+)
+
+
+def _render_records(columns, start: int) -> list:
+    """Encode tree rows from index `start` on as JSON objects keyed by FIELDNAMES."""
+    return [
+        _RECORD_TEMPLATE % tuple(map(_json_str, row))
+        for row in zip(*(column[start:] for column in columns))
+    ]
+
+
+def load_trees_payload() -> tuple:
+    """Return the stored trees encoded as JSON bytes, along with an ETag.
+
+    The encoded payload is kept in the cache and reused verbatim until the
+    CSV changes. Each row's JSON object is also kept, so after an append only
+    the new rows are encoded and the payload is rebuilt with a single join.
+    """
+    with cache_lock:
+        columns = load_trees()
+        if not _cache["payload"]:
+            records = _cache["records"]
+            records += _render_records(columns, len(records))
+            payload = ("[" + ", ".join(records) + "]").encode("ascii")
+            _cache["payload"] = payload
+            _cache["etag"] = _etag(payload)
+        return _cache["payload"], _cache["etag"]
+
+
+def _etag(body: bytes) -> str:
+    """Return a strong ETag for `body`."""
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _static_variant(body: bytes, content_type: str, mtime: float, extra: str) -> tuple:
+    """Return ``(headers_bytes, body, etag)`` for one encoding of a static file."""
+    etag = _etag(body)
+    headers = (
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Last-Modified: {email.utils.formatdate(mtime, usegmt=True)}\r\n"
+        f"ETag: {etag}\r\n"
+        f"{extra}"
+    ).encode("latin-1")
+    return headers, body, etag
+
+
+def _load_static(path: str) -> tuple:
+    """Read a static file and precompute its responses.
+
+    Returns ``(plain, gzipped, mtime)``; `gzipped` is None for types that
+    do not compress or when compression does not make the file smaller.
+    """
+    with open(path, "rb") as file:
+        st = os.fstat(file.fileno())
+        body = file.read()
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if not content_type.startswith("text/") and not content_type.endswith(
+        ("json", "javascript", "xml")
+    ):
+        return _static_variant(body, content_type, st.st_mtime, ""), None, st.st_mtime
+    compressed = gzip.compress(body, mtime=0)
+    if len(compressed) >= len(body):
+        return _static_variant(body, content_type, st.st_mtime, ""), None, st.st_mtime
+    return (
+        _static_variant(body, content_type, st.st_mtime, "Vary: Accept-Encoding\r\n"),
+        _static_variant(
+            compressed,
+            content_type,
+            st.st_mtime,
+            "Content-Encoding: gzip\r\nVary: Accept-Encoding\r\n",
+        ),
+        st.st_mtime,
+    )
+
+
+def load_static_files() -> None:
+    """Read every file under STATIC_DIR into memory, keyed by URL path.
+
+    The bundle is treated as immutable while the server runs; files added
+    later are still served from disk, but edits need a restart.
+    """
+    global _static_files
+    files = {}
+    for dirpath, _, filenames in os.walk(STATIC_DIR):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            route = "/" + os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+            files[route] = _load_static(path)
+    if "/index.html" in files:
+        files["/"] = files["/index.html"]
+    _static_files = files
+
+
+_static_files = {}
+
+
+_API_PATHS = frozenset({"/api/trees"})
+
+
+def _route(path: str) -> str:
+    """Return the request path without its query string (cheaper than urlparse)."""
+    i = path.find("?")
+    return path if i < 0 else path[:i]
+
+
+class ThreadPoolHTTPServer(HTTPServer):
+    """HTTPServer that handles requests on a bounded pool of reused threads."""
+
+    def __init__(
+        self, server_address, handler_class, max_workers=HTTP_THREADS, reuse_port=False
+    ):
+        self.reuse_port = reuse_port
+        # Created first: TCPServer.__init__ calls server_close if binding fails.
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="treewalk-http"
+        )
+        # Accepted connections not yet shut down, queued or being handled.
+        self.connections = set()
+        self.connections_lock = threading.Lock()
+        super().__init__(server_address, handler_class)
+
+    def server_bind(self):
+        """Bind, with SO_REUSEPORT if several worker processes share the port.
+
+        A lone server must not set it, or a second instance would silently
+        bind alongside it. The option is set here rather than through
+        allow_reuse_port, which socketserver only honors from Python 3.11.
+        """
+        if self.reuse_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
 
+    def process_request(self, request, client_address):
+        with self.connections_lock:
+            self.connections.add(request)
+        future = self.executor.submit(
+            self.process_request_thread, request, client_address
+        )
 
-class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
-    daemon_threads = True
+        def close_if_cancelled(future):
+            if future.cancelled():
+                self.shutdown_request(request)
+
+        future.add_done_callback(close_if_cancelled)
+
+    def process_request_thread(self, request, client_address):
+        """Same as ThreadingMixIn.process_request_thread, run on the pool."""
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def shutdown_request(self, request):
+        with self.connections_lock:
+            self.connections.discard(request)
+        super().shutdown_request(request)
+
+    def server_close(self):
+        """Stop accepting and release every connection without waiting on it.
+
+        Queued connections are closed as their futures are cancelled. The
+        sockets of in-flight ones are shut down, which wakes their handlers
+        so the pool threads (which, unlike daemon threads, the interpreter
+        joins at exit) finish promptly.
+        """
+        super().server_close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        with self.connections_lock:
+            connections = list(self.connections)
+        for request in connections:
+            try:
+                request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
 
 
 class RequestHandler(SimpleHTTPRequestHandler):
     """Custom request handler to serve static files and API requests."""
 
+    protocol_version = "HTTP/1.1" if KEEPALIVE_TIMEOUT > 0 else "HTTP/1.0"
+    timeout = REQUEST_TIMEOUT
+    # Set TCP_NODELAY so small JSON responses are not held back by Nagle.
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        """Handle requests, dropping the connection once it sits idle.
+
+        The first request must start within CONNECT_TIMEOUT and each later
+        one within KEEPALIVE_TIMEOUT of the previous response.
+        """
+        self.close_connection = True
+        if not self.wait_for_next_request(CONNECT_TIMEOUT):
+            return
+        self.handle_one_request()
+        while not self.close_connection and self.wait_for_next_request(
+            KEEPALIVE_TIMEOUT
+        ):
+            self.handle_one_request()
+
+    def wait_for_next_request(self, timeout):
+        """Return True once the next request starts arriving on the connection.
+
+        Waits with the short `timeout` rather than REQUEST_TIMEOUT, so an
+        idle connection gives its pool thread back quickly.
+        """
+        self.connection.settimeout(timeout)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
     def translate_path(self, path):
         """Serve files relative to STATIC_DIR instead of cwd."""
         path = urlparse(path).path
@@ -60,43 +500,182 @@ class RequestHandler(SimpleHTTPRequestHandler):
             path = path[1:]
         return os.path.join(STATIC_DIR, path)
 
+    def copyfile(self, source, outputfile):
+        """Send static file bytes with sendfile(2), keeping them in the kernel.
+
+        socket.sendfile falls back to plain sends for sources without a file
+        descriptor and copes with the keep-alive socket timeout.
+        """
+        if outputfile is not self.wfile:
+            shutil.copyfileobj(source, outputfile)
+            return
+        outputfile.flush()
+        self.connection.sendfile(source, source.tell())
+
     def do_GET(self):
-        parsed = urlparse(self.path)
-        if parsed.path == "/api/trees":
+        route = _route(self.path)
+        if route in _API_PATHS:
             self.handle_get_trees()
             return
+        if self.send_cached_static():
+            return
         super().do_GET()
 
+    def do_HEAD(self):
+        if self.send_cached_static(head=True):
+            return
+        super().do_HEAD()
+
+    def send_cached_static(self, head=False):
+        """Serve a static file from memory, without touching the filesystem.
+
+        Returns False for paths not loaded by load_static_files, leaving
+        directories, redirects and 404s to SimpleHTTPRequestHandler.
+        """
+        entry = _static_files.get(_route(self.path))
+        if entry is None:
+            return False
+        plain, gzipped, mtime = entry
+        if gzipped is not None and self.accepts_gzip():
+            headers, body, etag = gzipped
+        else:
+            headers, body, etag = plain
+        if self.not_modified(etag, mtime):
+            self.send_not_modified(etag)
+        else:
+            self.send_raw(200, headers, b"" if head else body)
+        return True
+
+    def not_modified(self, etag, mtime):
+        """Return True if the request's validators match `etag` or `mtime`.
+
+        As in SimpleHTTPRequestHandler, If-None-Match takes precedence over
+        If-Modified-Since.
+        """
+        if "If-None-Match" in self.headers:
+            return self.etag_matches(etag)
+        header = self.headers.get("If-Modified-Since")
+        if not header:
+            return False
+        try:
+            since = email.utils.parsedate_to_datetime(header)
+        except (TypeError, IndexError, OverflowError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=datetime.timezone.utc)
+        return int(mtime) <= since.timestamp()
+
+    def accepts_gzip(self):
+        """Return True if the request's Accept-Encoding allows gzip."""
+        header = self.headers.get("Accept-Encoding")
+        if not header:
+            return False
+        for coding in header.split(","):
+            name, _, params = coding.partition(";")
+            if name.strip().lower() != "gzip":
+                continue
+            params = params.replace(" ", "")
+            if not params.startswith("q="):
+                return True
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return False
+
     def do_POST(self):
-        parsed = urlparse(self.path)
-        if parsed.path == "/api/trees":
+        route = _route(self.path)
+        if route in _API_PATHS:
             self.handle_post_tree()
             return
         self.send_error(404, "Not Found")
 
-    def send_json(self, data, status=200):
-        payload = json.dumps(data).encode("utf-8")
-        self.send_response(status)
-        self.send_header("Content-Type", "application/json")
-        self.send_header("Content-Length", str(len(payload)))
-        self.end_headers()
-        self.wfile.write(payload)
+    def send_raw(self, status, headers, body):
+        """Write the status line, `headers` (raw bytes) and `body` in one write.
+
+        Bypasses send_response/send_header, which buffer each header line
+        separately.
+        """
+        self.log_request(status)
+        self.wfile.write(
+            b"".join(
+                (
+                    f"{self.protocol_version} {status} {self.responses[status][0]}\r\n"
+                    f"Server: {self.version_string()}\r\n"
+                    f"Date: {self.date_time_string()}\r\n".encode("latin-1"),
+                    headers,
+                    b"Connection: close\r\n" if self.close_connection else b"",
+                    b"\r\n",
+                    body,
+                )
+            )
+        )
+
+    def send_not_modified(self, etag):
+        self.send_raw(304, f"ETag: {etag}\r\n".encode("latin-1"), b"")
+
+    def send_json(self, data, status=200, payload=None, etag=None):
+        """Send `data` as JSON, or `payload` verbatim if it is already encoded."""
+        if payload is None:
+            payload = _dumps(data)
+        headers = (
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+        )
+        if etag:
+            headers += f"ETag: {etag}\r\n"
+        self.send_raw(status, headers.encode("latin-1"), payload)
+
+    def etag_matches(self, etag):
+        """Return True if the request's If-None-Match header covers `etag`."""
+        header = self.headers.get("If-None-Match")
+        if not header:
+            return False
+        tags = {tag.strip() for tag in header.split(",")}
+        return "*" in tags or etag in tags or "W/" + etag in tags
 
     def handle_get_trees(self):
-        ensure_csv()
-        with open(CSV_PATH, newline="", encoding="utf-8") as file:
-            reader = csv.DictReader(file)
-            trees = list(reader)
-        self.send_json(trees)
+        try:
+            payload, etag = load_trees_payload()
+        except FileNotFoundError:
+            # The CSV was removed while running; recreate it.
+            ensure_csv()
+            payload, etag = load_trees_payload()
+        if self.etag_matches(etag):
+            self.send_not_modified(etag)
+            return
+        self.send_json(None, payload=payload, etag=etag)
 
     def handle_post_tree(self):
-        content_length = int(self.headers.get("Content-Length", 0))
-        body = self.rfile.read(content_length).decode("utf-8")
         try:
-            data = json.loads(body)
-        except json.JSONDecodeError:
+            content_length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            content_length = -1
+        if content_length < 0:
+            # Without a usable length the body cannot be skipped either.
+            self.close_connection = True
+            self.send_json({"error": "Invalid Content-Length"}, status=400)
+            return
+        if content_length > MAX_BODY_BYTES:
+            # The body is left unread, so the connection cannot be reused.
+            self.close_connection = True
+            self.send_json({"error": "Request body too large"}, status=413)
+            return
+        try:
+            body = self.rfile.read(content_length)
+        except socket.timeout:
+            # Not a TimeoutError subclass before Python 3.10.
+            self.close_connection = True
+            self.send_json({"error": "Request body timed out"}, status=408)
+            return
+        try:
+            data = _loads(body)
+        except ValueError:
             self.send_json({"error": "Invalid JSON"}, status=400)
             return
+        if not isinstance(data, dict):
+            self.send_json({"error": "Expected a JSON object"}, status=400)
+            return
 
         lat = data.get("lat")
         lon = data.get("lon")
@@ -109,26 +688,135 @@ class RequestHandler(SimpleHTTPRequestHandler):
             self.send_json({"error": "lat and lon must be numeric"}, status=400)
             return
 
-        tree_id = int(datetime.utcnow().timestamp() * 1000)
-        timestamp = int(datetime.utcnow().timestamp())
-        row = [tree_id, lat, lon, species, notes, timestamp]
+        ns = time.time_ns()
+        tree_id = ns // 1_000_000
+        timestamp = ns // 1_000_000_000
+        line = _format_row(tree_id, lat, lon, species, notes, timestamp)
 
-        with csv_lock:
-            ensure_csv()
-            with open(CSV_PATH, "a", newline="", encoding="utf-8") as file:
-                writer = csv.writer(file)
-                writer.writerow(row)
+        values = (
+            str(tree_id),
+            repr(lat),
+            repr(lon),
+            "" if species is None else str(species),
+            "" if notes is None else str(notes),
+            str(timestamp),
+        )
+        try:
+            append_row(line, values)
+        except Exception as exc:
+            self.log_error("Failed to store tree: %r", exc)
+            self.send_json({"error": "Failed to store tree"}, status=500)
+            return
 
         self.send_json({"status": "success", "id": tree_id}, status=201)
 
 
-csv_lock = threading.Lock()
+csv_lock = threading.RLock()
+cache_lock = threading.RLock()
+_append_fd = None
+_cache = {
+    "mtime_ns": 0,
+    "size": 0,
+    "columns": _new_columns(),
+    "records": [],
+    "payload": b"",
+    "etag": "",
+}
+_write_queue = collections.deque()
+_write_ready = threading.Condition()
+_fdatasync = getattr(os, "fdatasync", os.fsync)
+
+
+class _PendingRow:
+    """A formatted CSV line waiting for the writer thread."""
 
+    __slots__ = ("line", "values", "done", "error")
 
-def run_server(port: int = 8000) -> None:
+    def __init__(self, line: bytes, values: tuple):
+        self.line = line
+        self.values = values
+        self.done = threading.Event()
+        self.error = None
+
+
+def append_row(line: bytes, values: tuple) -> None:
+    """Queue a CSV line for the writer thread and wait until it is on disk.
+
+    `values` are the row's column strings, used to patch the tree cache.
+    """
+    pending = _PendingRow(line, values)
+    with _write_ready:
+        _write_queue.append(pending)
+        _write_ready.notify()
+    pending.done.wait()
+    if pending.error is not None:
+        raise pending.error
+
+
+def _write_batch(batch: list) -> None:
+    """Append a batch of rows with one write and one fdatasync."""
+    chunk = b"".join(pending.line for pending in batch)
+    # Follow the CSV if it was deleted or replaced since the last batch.
     ensure_csv()
-    httpd = ThreadingHTTPServer(("0.0.0.0", port), RequestHandler)
-    print(f"TreeWalk server running on port {port}")
+    before = os.fstat(_append_fd)
+    # One write on an O_APPEND descriptor: local filesystems on Linux
+    # serialize such writes, so batches from several worker processes land
+    # whole. Only a short write (e.g. a full disk) splits a batch, and its
+    # retried remainder may then follow another process's rows.
+    view = memoryview(chunk)
+    while view:
+        view = view[os.write(_append_fd, view):]
+    _fdatasync(_append_fd)
+    after = os.fstat(_append_fd)
+    with cache_lock:
+        # Only patch the cache if it reflected the file right before our
+        # write and nobody else appended in between; otherwise leave it stale
+        # so the next GET re-parses.
+        if (
+            before.st_mtime_ns == _cache["mtime_ns"]
+            and before.st_size == _cache["size"]
+            and after.st_size == before.st_size + len(chunk)
+        ):
+            for pending in batch:
+                for column, value in zip(_cache["columns"], pending.values):
+                    column.append(value)
+            _cache["mtime_ns"] = after.st_mtime_ns
+            _cache["size"] = after.st_size
+            _cache["payload"] = b""
+            _cache["etag"] = ""
+
+
+def _writer_loop() -> None:
+    while True:
+        with _write_ready:
+            while not _write_queue:
+                _write_ready.wait()
+            count = min(len(_write_queue), BATCH_MAX_ROWS)
+            batch = [_write_queue.popleft() for _ in range(count)]
+        try:
+            _write_batch(batch)
+        except Exception as exc:
+            # Report the failure to the waiting handlers; the writer itself
+            # must keep running or every later POST would block forever.
+            for pending in batch:
+                pending.error = exc
+        finally:
+            for pending in batch:
+                pending.done.set()
+
+
+def start_writer() -> threading.Thread:
+    """Start the daemon thread that drains queued rows to the CSV."""
+    thread = threading.Thread(target=_writer_loop, name="treewalk-writer", daemon=True)
+    thread.start()
+    return thread
+
+
+def _serve(port: int, reuse_port: bool = False) -> None:
+    httpd = ThreadPoolHTTPServer(
+        ("0.0.0.0", port), RequestHandler, reuse_port=reuse_port
+    )
+    start_writer()
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
@@ -137,5 +825,67 @@ def run_server(port: int = 8000) -> None:
         httpd.server_close()
 
 
+def _reap(children: set, ignore_signal: int = 0) -> bool:
+    """Wait for one worker to exit; return True if it failed."""
+    pid, status = os.wait()
+    children.discard(pid)
+    code = os.waitstatus_to_exitcode(status)
+    if code == 0 or code == -ignore_signal:
+        return False
+    print(f"TreeWalk worker {pid} exited with status {code}", file=sys.stderr)
+    return True
+
+
+def _run_workers(port: int, workers: int) -> None:
+    children = set()
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                _serve(port, reuse_port=True)
+            except BaseException:
+                traceback.print_exc()
+                status = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(status)
+        children.add(pid)
+    print(f"TreeWalk server running on port {port} with {workers} workers")
+    failed = False
+    try:
+        while children:
+            failed |= _reap(children)
+    except KeyboardInterrupt:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        while children:
+            failed |= _reap(children, ignore_signal=signal.SIGTERM)
+    if failed:
+        raise SystemExit(1)
+
+
+def run_server(port: int = 8000, workers: int = WORKERS) -> None:
+    """Serve on `port`, forking `workers` processes that share it.
+
+    Each worker binds its own SO_REUSEPORT socket, so the kernel spreads
+    incoming connections across them.
+    """
+    ensure_csv()
+    load_static_files()
+    try:
+        if workers <= 1 or not hasattr(os, "fork"):
+            print(f"TreeWalk server running on port {port}")
+            _serve(port)
+        else:
+            _run_workers(port, workers)
+    finally:
+        close_csv()
+
+
 if __name__ == "__main__":
     run_server(port=int(os.environ.get("PORT", "8000")))
@@ -0,0 +1,511 @@
+"""Tests for the TreeWalk server's CSV storage and tree cache.
+
+Run with ``python -m unittest discover -s tests`` from the repository root.
+"""
+
+import csv
+import gzip
+import http.client
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "TreeWalk"))
+
+import app  # noqa: E402
+
+
+SAMPLE_VALUES = [
+    "",
+    "Oak",
+    "Élm ☃",
+    "with, comma",
+    'with "quotes"',
+    "multi\nline",
+    "crlf\r\nline",
+    '", mixed\n"',
+    " leading and trailing ",
+]
+
+
+class CsvTestCase(unittest.TestCase):
+    """Points the app at a fresh CSV in a temporary directory."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.saved = (app.DATA_DIR, app.CSV_PATH)
+        app.DATA_DIR = self.tmp.name
+        app.CSV_PATH = os.path.join(self.tmp.name, "trees.csv")
+        self.addCleanup(self.restore)
+        self.reset_cache()
+        app.ensure_csv()
+
+    def restore(self):
+        app.close_csv()
+        app.DATA_DIR, app.CSV_PATH = self.saved
+        self.reset_cache()
+
+    def reset_cache(self):
+        app._cache.update(
+            mtime_ns=0,
+            size=0,
+            columns=app._new_columns(),
+            records=[],
+            payload=b"",
+            etag="",
+        )
+
+    def dict_reader_rows(self):
+        with open(app.CSV_PATH, newline="", encoding="utf-8") as file:
+            return list(csv.DictReader(file))
+
+    def served_rows(self):
+        payload, _ = app.load_trees_payload()
+        return json.loads(payload)
+
+    def append(self, tree_id, species="", notes=""):
+        line = app._format_row(tree_id, 1.5, -2.25, species, notes, 1700000000)
+        values = (str(tree_id), "1.5", "-2.25", species, notes, "1700000000")
+        app._write_batch([app._PendingRow(line, values)])
+
+
+class FormatRowTest(unittest.TestCase):
+    def test_csv_field_matches_csv_writer(self):
+        for value in SAMPLE_VALUES:
+            buffer = io.StringIO()
+            csv.writer(buffer, lineterminator="\n").writerow(["x", value])
+            self.assertEqual("x," + app._csv_field(value) + "\n", buffer.getvalue())
+
+    def test_format_row_matches_csv_writer(self):
+        for species in SAMPLE_VALUES:
+            for notes in SAMPLE_VALUES:
+                buffer = io.StringIO()
+                row = [1762283044818, 30.7, 76.7, species, notes, 1762283044]
+                csv.writer(buffer, lineterminator="\n").writerow(row)
+                self.assertEqual(
+                    app._format_row(*row), buffer.getvalue().encode("utf-8")
+                )
+
+    def test_none_is_empty(self):
+        line = app._format_row(1, 2.0, 3.0, None, None, 4)
+        self.assertEqual(line, b"1,2.0,3.0,,,4\n")
+
+
+class ParseCsvTest(CsvTestCase):
+    def test_round_trip_matches_dict_reader(self):
+        with open(app.CSV_PATH, "ab") as file:
+            for i, species in enumerate(SAMPLE_VALUES):
+                for notes in SAMPLE_VALUES:
+                    file.write(app._format_row(i, 1.0, 2.0, species, notes, 3))
+        self.assertEqual(self.served_rows(), self.dict_reader_rows())
+
+    def test_irregular_lines_match_dict_reader(self):
+        with open(app.CSV_PATH, "ab") as file:
+            file.write(b"1,2,3,a,b,c\r\n\n\r\n7,8\n9,\"x\ny\",z\n10,11,12,last,,13")
+        self.assertEqual(self.served_rows(), self.dict_reader_rows())
+
+    def test_stray_quote_in_unquoted_field_matches_dict_reader(self):
+        with open(app.CSV_PATH, "ab") as file:
+            file.write(b'1,2,3,a"b,c,4\n5,6,7,"d, e",f,8\n9,10,11,g,h,12\n')
+        self.assertEqual(self.served_rows(), self.dict_reader_rows())
+        self.assertEqual(self.served_rows()[0]["species"], 'a"b')
+
+    def test_extra_fields_are_dropped(self):
+        with open(app.CSV_PATH, "ab") as file:
+            file.write(b"1,2,3,a,b,4,extra\n")
+        expected = self.dict_reader_rows()
+        del expected[0][None]
+        self.assertEqual(self.served_rows(), expected)
+
+    def test_parse_csv_reads_buffer_up_to_its_length(self):
+        data = b"id,lat,lon,species,notes,timestamp\n1,2,3,a,b,4\n"
+        columns = app._parse_csv(data)
+        self.assertEqual(
+            [column[0] for column in columns], ["1", "2", "3", "a", "b", "4"]
+        )
+
+    def test_payload_matches_json_dumps_of_dict_reader(self):
+        with open(app.CSV_PATH, "ab") as file:
+            file.write(app._format_row(1, 1.0, 2.0, "Élm, \"x\"", "n\n", 3))
+        payload, _ = app.load_trees_payload()
+        self.assertEqual(payload, json.dumps(self.dict_reader_rows()).encode("utf-8"))
+
+    def test_rebuild_ignores_rows_appended_after_fstat(self):
+        real_fstat = os.fstat
+        appended = []
+
+        def fstat_then_append(fd):
+            st = real_fstat(fd)
+            if not appended:
+                appended.append(True)
+                with open(app.CSV_PATH, "ab") as file:
+                    file.write(app._format_row(1, 1.0, 2.0, "late", "", 3))
+            return st
+
+        with mock.patch.object(os, "fstat", fstat_then_append):
+            columns = app.load_trees()
+        # The cache describes the file as it was at the fstat, so the late
+        # row must not be in it yet; a writer patching it in would otherwise
+        # duplicate it.
+        self.assertEqual(columns[0], [])
+        self.assertEqual(self.served_rows(), self.dict_reader_rows())
+
+
+class CachePatchTest(CsvTestCase):
+    def test_append_then_get_patches_cache(self):
+        self.assertEqual(self.served_rows(), [])
+        for i, species in enumerate(SAMPLE_VALUES):
+            self.append(i, species, "notes %d" % i)
+            # The cache must have been patched in place, not invalidated.
+            st = os.stat(app.CSV_PATH)
+            self.assertEqual(app._cache["size"], st.st_size)
+            self.assertEqual(self.served_rows(), self.dict_reader_rows())
+
+    def test_external_append_is_not_patched(self):
+        self.served_rows()
+        with open(app.CSV_PATH, "ab") as file:
+            file.write(app._format_row(1, 1.0, 2.0, "external", "", 3))
+        self.append(2, "ours")
+        rows = self.served_rows()
+        self.assertEqual(rows, self.dict_reader_rows())
+        self.assertEqual([row["species"] for row in rows], ["external", "ours"])
+
+    def test_append_follows_deleted_file(self):
+        self.append(1, "old")
+        os.remove(app.CSV_PATH)
+        self.append(2, "new")
+        self.assertEqual([row["id"] for row in self.dict_reader_rows()], ["2"])
+        self.assertEqual(self.served_rows(), self.dict_reader_rows())
+
+    def test_append_follows_replaced_file(self):
+        self.append(1, "old")
+        replacement = app.CSV_PATH + ".new"
+        with open(replacement, "wb") as file:
+            file.write(b"id,lat,lon,species,notes,timestamp\n")
+            file.write(app._format_row(5, 1.0, 2.0, "edited", "", 3))
+        os.replace(replacement, app.CSV_PATH)
+        self.append(2, "new")
+        self.assertEqual([row["id"] for row in self.dict_reader_rows()], ["5", "2"])
+        self.assertEqual(self.served_rows(), self.dict_reader_rows())
+
+    def test_etag_changes_after_append(self):
+        _, before = app.load_trees_payload()
+        self.append(1, "Oak")
+        _, after = app.load_trees_payload()
+        self.assertNotEqual(before, after)
+
+
+_writer_started = False
+
+
+class ServerTestCase(CsvTestCase):
+    """Runs a real server on an ephemeral port against the temporary CSV."""
+
+    max_workers = app.HTTP_THREADS
+
+    def setUp(self):
+        global _writer_started
+        super().setUp()
+        if not _writer_started:
+            app.start_writer()
+            _writer_started = True
+        patcher = mock.patch.object(
+            app.RequestHandler, "log_message", lambda *args: None
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.httpd = app.ThreadPoolHTTPServer(
+            ("127.0.0.1", 0), app.RequestHandler, max_workers=self.max_workers
+        )
+        thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.stop_server)
+        self.port = self.httpd.server_address[1]
+
+    def stop_server(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def request(self, method, path, body=None, headers=None):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=10)
+        self.addCleanup(connection.close)
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response, response.read()
+
+    def raw_request(self, data):
+        """Send raw request bytes and return the response's status code."""
+        with socket.create_connection(("127.0.0.1", self.port), timeout=10) as sock:
+            sock.sendall(data)
+            status_line = sock.makefile("rb").readline()
+        return int(status_line.split()[1])
+
+
+class PostTreeTest(ServerTestCase):
+    def test_post_then_get(self):
+        body = json.dumps({"lat": 1.5, "lon": 2, "species": 'Oak, "big"'})
+        response, data = self.request("POST", "/api/trees", body)
+        self.assertEqual(response.status, 201)
+        response, data = self.request("GET", "/api/trees")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(json.loads(data), self.dict_reader_rows())
+        self.assertEqual(json.loads(data)[0]["species"], 'Oak, "big"')
+
+    def test_write_failure_returns_500_and_writer_survives(self):
+        body = json.dumps({"lat": 1, "lon": 2})
+        with mock.patch.object(app, "_write_batch", side_effect=RuntimeError("boom")):
+            response, _ = self.request("POST", "/api/trees", body)
+        self.assertEqual(response.status, 500)
+        response, _ = self.request("POST", "/api/trees", body)
+        self.assertEqual(response.status, 201)
+        self.assertEqual(len(self.dict_reader_rows()), 1)
+
+    def test_invalid_json(self):
+        response, _ = self.request("POST", "/api/trees", b"{bad")
+        self.assertEqual(response.status, 400)
+
+    def test_json_that_is_not_an_object(self):
+        for body in (b"[1, 2]", b'"x"', b"3", b"null"):
+            response, _ = self.request("POST", "/api/trees", body)
+            self.assertEqual(response.status, 400)
+
+    def test_body_too_large(self):
+        body = b"x" * (app.MAX_BODY_BYTES + 1)
+        response, _ = self.request("POST", "/api/trees", body)
+        self.assertEqual(response.status, 413)
+
+    def test_negative_content_length(self):
+        status = self.raw_request(
+            b"POST /api/trees HTTP/1.1\r\nHost: x\r\nContent-Length: -1\r\n\r\n"
+            + b"x" * 1024
+        )
+        self.assertEqual(status, 400)
+
+    def test_malformed_content_length(self):
+        status = self.raw_request(
+            b"POST /api/trees HTTP/1.1\r\nHost: x\r\nContent-Length: ten\r\n\r\n"
+        )
+        self.assertEqual(status, 400)
+
+
+class GetTreesTest(ServerTestCase):
+    def test_if_none_match_returns_304(self):
+        self.append(1, "Oak")
+        response, data = self.request("GET", "/api/trees")
+        etag = response.getheader("ETag")
+        self.assertEqual((response.status, json.loads(data)[0]["id"]), (200, "1"))
+        response, data = self.request(
+            "GET", "/api/trees", headers={"If-None-Match": etag}
+        )
+        self.assertEqual((response.status, data), (304, b""))
+        self.assertEqual(response.getheader("ETag"), etag)
+        self.append(2, "Elm")
+        response, _ = self.request(
+            "GET", "/api/trees", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status, 200)
+        self.assertNotEqual(response.getheader("ETag"), etag)
+
+    def test_query_string_still_routes_to_api(self):
+        self.append(1, "Oak")
+        response, data = self.request("GET", "/api/trees?since=0&_=123")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(json.loads(data), self.dict_reader_rows())
+        body = json.dumps({"lat": 1, "lon": 2})
+        response, _ = self.request("POST", "/api/trees?source=app", body)
+        self.assertEqual(response.status, 201)
+        self.assertEqual(len(self.dict_reader_rows()), 2)
+
+
+class StaticFilesTest(ServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = tempfile.TemporaryDirectory()
+        self.addCleanup(self.static.cleanup)
+        self.body = b"body { color: green; }\n" * 50
+        with open(os.path.join(self.static.name, "site.css"), "wb") as file:
+            file.write(self.body)
+        patcher = mock.patch.object(app, "STATIC_DIR", self.static.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        app.load_static_files()
+        self.addCleanup(app.load_static_files)
+
+    def test_get_and_gzip(self):
+        response, data = self.request("GET", "/site.css?v=1")
+        self.assertEqual((response.status, data), (200, self.body))
+        response, data = self.request(
+            "GET", "/site.css", headers={"Accept-Encoding": "gzip"}
+        )
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(gzip.decompress(data), self.body)
+
+    def test_if_none_match(self):
+        response, _ = self.request("GET", "/site.css")
+        etag = response.getheader("ETag")
+        response, data = self.request(
+            "GET", "/site.css", headers={"If-None-Match": etag}
+        )
+        self.assertEqual((response.status, data), (304, b""))
+
+    def test_if_modified_since(self):
+        response, _ = self.request("GET", "/site.css")
+        last_modified = response.getheader("Last-Modified")
+        response, data = self.request(
+            "GET", "/site.css", headers={"If-Modified-Since": last_modified}
+        )
+        self.assertEqual((response.status, data), (304, b""))
+        response, _ = self.request(
+            "GET",
+            "/site.css",
+            headers={"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"},
+        )
+        self.assertEqual(response.status, 200)
+
+    def test_head_is_served_from_memory(self):
+        os.remove(os.path.join(self.static.name, "site.css"))
+        response, data = self.request("HEAD", "/site.css")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(data, b"")
+        self.assertEqual(int(response.getheader("Content-Length")), len(self.body))
+
+
+class BindTest(unittest.TestCase):
+    def test_second_server_cannot_bind_same_port(self):
+        first = app.ThreadPoolHTTPServer(("127.0.0.1", 0), app.RequestHandler)
+        self.addCleanup(first.server_close)
+        with self.assertRaises(OSError):
+            second = app.ThreadPoolHTTPServer(first.server_address, app.RequestHandler)
+            second.server_close()
+
+    def test_workers_share_port_with_reuse_port(self):
+        first = app.ThreadPoolHTTPServer(
+            ("127.0.0.1", 0), app.RequestHandler, reuse_port=True
+        )
+        self.addCleanup(first.server_close)
+        second = app.ThreadPoolHTTPServer(
+            first.server_address, app.RequestHandler, reuse_port=True
+        )
+        second.server_close()
+
+    @unittest.skipUnless(hasattr(os, "fork"), "workers need os.fork")
+    def test_worker_bind_failure_exits_nonzero(self):
+        taken = app.ThreadPoolHTTPServer(("127.0.0.1", 0), app.RequestHandler)
+        self.addCleanup(taken.server_close)
+        with tempfile.TemporaryDirectory() as tmp:
+            script = (
+                "import sys; sys.path.insert(0, %r); import app; "
+                "app.DATA_DIR = %r; app.CSV_PATH = %r; app.STATIC_DIR = %r; "
+                "app.run_server(port=%d, workers=2)"
+                % (
+                    os.path.dirname(app.__file__),
+                    tmp,
+                    os.path.join(tmp, "trees.csv"),
+                    tmp,
+                    taken.server_address[1],
+                )
+            )
+            result = subprocess.run(
+                [sys.executable, "-c", script],
+                capture_output=True,
+                text=True,
+                timeout=30,
+            )
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("Address already in use", result.stderr)
+        self.assertEqual(result.stderr.count("exited with status 1"), 2)
+
+
+class ConnectionPoolTest(ServerTestCase):
+    max_workers = 1
+
+    def connect_idle(self):
+        sock = socket.create_connection(("127.0.0.1", self.port), timeout=10)
+        self.addCleanup(sock.close)
+        return sock
+
+    def wait_for_connections(self, count):
+        deadline = time.monotonic() + 5
+        while len(self.httpd.connections) != count:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_silent_connection_releases_pool_thread(self):
+        with mock.patch.object(app, "CONNECT_TIMEOUT", 0.2):
+            self.connect_idle()
+            self.wait_for_connections(1)
+            started = time.monotonic()
+            response, _ = self.request("GET", "/api/trees")
+        self.assertEqual(response.status, 200)
+        self.assertLess(time.monotonic() - started, 2)
+
+    def test_server_close_releases_all_connections(self):
+        with mock.patch.object(app, "CONNECT_TIMEOUT", 30):
+            handled = self.connect_idle()
+            self.wait_for_connections(1)
+            queued = self.connect_idle()
+            self.wait_for_connections(2)
+            started = time.monotonic()
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.assertEqual(handled.recv(1), b"")
+            self.assertEqual(queued.recv(1), b"")
+            self.wait_for_connections(0)
+        self.assertLess(time.monotonic() - started, 2)
+
+
+class KeepAliveTest(ServerTestCase):
+    max_workers = 1
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(app, "KEEPALIVE_TIMEOUT", 0.2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @unittest.skipIf("TREEWALK_KEEPALIVE" in os.environ, "keep-alive configured")
+    def test_keepalive_is_on_by_default(self):
+        self.assertEqual(app.RequestHandler.protocol_version, "HTTP/1.1")
+
+    def test_connection_is_reused(self):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=10)
+        self.addCleanup(connection.close)
+        for _ in range(3):
+            connection.request("GET", "/api/trees")
+            response = connection.getresponse()
+            response.read()
+            self.assertEqual(response.status, 200)
+            self.assertIsNone(response.getheader("Connection"))
+
+    def test_idle_connection_releases_pool_thread(self):
+        idle = http.client.HTTPConnection("127.0.0.1", self.port, timeout=10)
+        self.addCleanup(idle.close)
+        idle.request("GET", "/api/trees")
+        idle.getresponse().read()
+        # With a single pool thread, this only completes once the idle
+        # connection above has been dropped.
+        started = time.monotonic()
+        response, _ = self.request("GET", "/api/trees")
+        self.assertEqual(response.status, 200)
+        self.assertLess(time.monotonic() - started, 2)
+
+    def test_slow_body_times_out_with_408(self):
+        with mock.patch.object(app.RequestHandler, "timeout", 0.5):
+            status = self.raw_request(
+                b"POST /api/trees HTTP/1.1\r\nHost: x\r\nContent-Length: 10\r\n\r\n{}"
+            )
+        self.assertEqual(status, 408)
+
+
+if __name__ == "__main__":
+    unittest.main()